@@ -2,6 +2,8 @@ use std::mem::transmute;
 
 use anyhow::Context;
 use pyo3::prelude::*;
+use pyo3::types::PyDict;
+use serde::Serialize;
 
 use crate::Testrun;
 
@@ -61,14 +63,16 @@ impl BinaryFormatWriter {
         Ok(())
     }
 
-    pub fn serialize(&mut self) -> anyhow::Result<Vec<u8>> {
+    pub fn serialize(&mut self, py: Python) -> anyhow::Result<Vec<u8>> {
         let writer = self
             .writer
             .take()
             .context("writer was already serialized")?;
-        let mut buffer = vec![];
-        writer.serialize(&mut buffer)?;
-        Ok(buffer)
+        py.allow_threads(|| {
+            let mut buffer = vec![];
+            writer.serialize(&mut buffer)?;
+            Ok(buffer)
+        })
     }
 }
 
@@ -79,6 +83,7 @@ pub struct AggregationReader {
 }
 
 #[pyclass(get_all)]
+#[derive(Serialize)]
 pub struct TestAggregate {
     pub name: String,
     // TODO:
@@ -123,39 +128,124 @@ impl AggregationReader {
     #[pyo3(signature = (interval_start, interval_end, flags=None))]
     pub fn get_test_aggregates(
         &self,
+        py: Python,
         interval_start: usize,
         interval_end: usize,
         flags: Option<Vec<String>>,
     ) -> anyhow::Result<Vec<TestAggregate>> {
+        // aggregation only touches the parsed buffer, so run it without the GIL
+        py.allow_threads(|| {
+            let flags: Option<Vec<_>> = flags
+                .as_ref()
+                .map(|flags| flags.iter().map(|flag| flag.as_str()).collect());
+            let desired_range = interval_start..interval_end;
+
+            let tests = self.format.tests(desired_range, flags.as_deref())?;
+            let mut collected_tests = vec![];
+
+            for test in tests {
+                let test = test?;
+
+                collected_tests.push(TestAggregate {
+                    name: test.name()?.into(),
+                    test_id: "TODO".into(),
+                    testsuite: Some(test.testsuite()?.into()),
+                    flags: test.flags()?.into_iter().map(|s| s.into()).collect(),
+                    failure_rate: test.aggregates().failure_rate,
+                    flake_rate: test.aggregates().flake_rate,
+                    updated_at: 0, // TODO
+                    avg_duration: test.aggregates().avg_duration,
+                    total_fail_count: test.aggregates().total_fail_count,
+                    total_flaky_fail_count: test.aggregates().total_flaky_fail_count,
+                    total_pass_count: test.aggregates().total_pass_count,
+                    total_skip_count: test.aggregates().total_skip_count,
+                    commits_where_fail: test.aggregates().failing_commits,
+                    last_duration: 0., // TODO
+                });
+            }
+
+            Ok(collected_tests)
+        })
+    }
+
+    /// Renders the aggregates for the given interval as a JSON string.
+    ///
+    /// The records are formatted entirely in Rust, so callers that only log
+    /// or forward the aggregates receive a single string instead of one
+    /// object with a dozen getters per test.
+    #[pyo3(signature = (interval_start, interval_end, flags=None))]
+    pub fn dump_json(
+        &self,
+        py: Python,
+        interval_start: usize,
+        interval_end: usize,
+        flags: Option<Vec<String>>,
+    ) -> anyhow::Result<String> {
+        let tests = self.get_test_aggregates(py, interval_start, interval_end, flags)?;
+        Ok(serde_json::to_string(&tests)?)
+    }
+
+    /// Returns the aggregates as one list per field instead of one object per test.
+    ///
+    /// This crosses the FFI boundary once per column rather than once per
+    /// test and attribute, which matters when iterating large files.
+    #[pyo3(signature = (interval_start, interval_end, flags=None))]
+    pub fn get_test_aggregates_columnar<'py>(
+        &self,
+        py: Python<'py>,
+        interval_start: usize,
+        interval_end: usize,
+        flags: Option<Vec<String>>,
+    ) -> anyhow::Result<Bound<'py, PyDict>> {
         let flags: Option<Vec<_>> = flags
             .as_ref()
             .map(|flags| flags.iter().map(|flag| flag.as_str()).collect());
         let desired_range = interval_start..interval_end;
 
         let tests = self.format.tests(desired_range, flags.as_deref())?;
-        let mut collected_tests = vec![];
+
+        let mut names: Vec<String> = vec![];
+        let mut testsuites: Vec<String> = vec![];
+        let mut test_flags: Vec<Vec<String>> = vec![];
+        let mut failure_rates: Vec<f32> = vec![];
+        let mut flake_rates: Vec<f32> = vec![];
+        let mut avg_durations: Vec<f64> = vec![];
+        let mut total_fail_counts: Vec<u32> = vec![];
+        let mut total_flaky_fail_counts: Vec<u32> = vec![];
+        let mut total_pass_counts: Vec<u32> = vec![];
+        let mut total_skip_counts: Vec<u32> = vec![];
+        let mut commits_where_fail: Vec<usize> = vec![];
 
         for test in tests {
             let test = test?;
-
-            collected_tests.push(TestAggregate {
-                name: test.name()?.into(),
-                test_id: "TODO".into(),
-                testsuite: Some(test.testsuite()?.into()),
-                flags: test.flags()?.into_iter().map(|s| s.into()).collect(),
-                failure_rate: test.aggregates().failure_rate,
-                flake_rate: test.aggregates().flake_rate,
-                updated_at: 0, // TODO
-                avg_duration: test.aggregates().avg_duration,
-                total_fail_count: test.aggregates().total_fail_count,
-                total_flaky_fail_count: test.aggregates().total_flaky_fail_count,
-                total_pass_count: test.aggregates().total_pass_count,
-                total_skip_count: test.aggregates().total_skip_count,
-                commits_where_fail: test.aggregates().failing_commits,
-                last_duration: 0., // TODO
-            });
+            let aggregates = test.aggregates();
+
+            names.push(test.name()?.into());
+            testsuites.push(test.testsuite()?.into());
+            test_flags.push(test.flags()?.into_iter().map(|s| s.into()).collect());
+            failure_rates.push(aggregates.failure_rate);
+            flake_rates.push(aggregates.flake_rate);
+            avg_durations.push(aggregates.avg_duration);
+            total_fail_counts.push(aggregates.total_fail_count);
+            total_flaky_fail_counts.push(aggregates.total_flaky_fail_count);
+            total_pass_counts.push(aggregates.total_pass_count);
+            total_skip_counts.push(aggregates.total_skip_count);
+            commits_where_fail.push(aggregates.failing_commits);
         }
 
-        Ok(collected_tests)
+        let columns = PyDict::new(py);
+        columns.set_item("name", names)?;
+        columns.set_item("testsuite", testsuites)?;
+        columns.set_item("flags", test_flags)?;
+        columns.set_item("failure_rate", failure_rates)?;
+        columns.set_item("flake_rate", flake_rates)?;
+        columns.set_item("avg_duration", avg_durations)?;
+        columns.set_item("total_fail_count", total_fail_counts)?;
+        columns.set_item("total_flaky_fail_count", total_flaky_fail_counts)?;
+        columns.set_item("total_pass_count", total_pass_counts)?;
+        columns.set_item("total_skip_count", total_skip_counts)?;
+        columns.set_item("commits_where_fail", commits_where_fail)?;
+
+        Ok(columns)
     }
 }
@@ -221,13 +221,18 @@ impl Aggregates {
         let mut total_flaky_fail_count = 0;
         let mut total_duration = 0.;
 
+        // the count/duration fold is kept free of the fallible commit-set
+        // lookups below so it stays a straight-line loop over the fixed-size
+        // records, which the compiler can unroll and vectorize
         for testdata in data {
             total_pass_count += testdata.total_pass_count as u32;
             total_fail_count += testdata.total_fail_count as u32;
             total_skip_count += testdata.total_skip_count as u32;
             total_flaky_fail_count += testdata.total_flaky_fail_count as u32;
             total_duration += testdata.total_duration as f64;
+        }
 
+        for testdata in data {
             let failing_commits =
                 CommitHashesSet::read_raw(commithashes_bytes, testdata.failing_commits_set)?;
             all_failing_commits.extend(failing_commits);
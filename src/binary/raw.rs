@@ -1,3 +1,19 @@
+//! The raw, on-disk layout of the test analytics format.
+//!
+//! A serialized file is laid out as:
+//!
+//! ```text
+//! [Header] [Test * num_tests] [TestData * num_tests * num_days]
+//! [flags set table] [commit hashes set] [string table]
+//! ```
+//!
+//! All records are plain-old-data with fixed size and 4-byte alignment, so
+//! [`TestAnalytics::parse`](super::TestAnalytics::parse) resolves them as
+//! references directly into the input buffer; reading aggregates never
+//! deserializes or copies individual records. Variable-length data (names,
+//! testsuites, flags) lives in the trailing tables and is referenced by
+//! `u32` offsets.
+
 use watto::Pod;
 
 /// The magic file preamble, encoded as little-endian `CCTA`.
@@ -39,18 +55,28 @@ pub struct Test {
 }
 unsafe impl Pod for Test {}
 
+/// Per-test, per-day aggregated run data.
+///
+/// The fields are deliberately narrow: counts are per-day and fit `u16`,
+/// and durations do not need more than `f32` precision. Together with the
+/// rates being derived on read rather than stored, this keeps the record
+/// at 24 bytes so daily-bucket scans touch as few cache lines as possible.
 #[derive(Debug, Clone, Copy, Default)]
 #[repr(C)]
 pub struct TestData {
+    /// Timestamp of the most recent run in this bucket.
     pub last_timestamp: u32,
+    /// Duration of the most recent run in this bucket.
     pub last_duration: f32,
 
     pub total_pass_count: u16,
     pub total_fail_count: u16,
     pub total_skip_count: u16,
     pub total_flaky_fail_count: u16,
+    /// Sum of all run durations in this bucket.
     pub total_duration: f32,
 
+    /// Offset of the failing commits within the `CommitHashesSet` table.
     pub failing_commits_set: u32,
 }
 unsafe impl Pod for TestData {}
@@ -2,6 +2,23 @@ use crate::testrun::Framework;
 use quick_xml::escape::unescape;
 use std::{borrow::Cow, collections::HashSet};
 
+/// Concatenates `parts` with `separator` into a single exactly-sized
+/// allocation, instead of going through `format!`'s runtime machinery.
+fn join_parts(parts: &[&str], separator: &str) -> String {
+    let len = parts.iter().map(|p| p.len()).sum::<usize>()
+        + separator.len() * parts.len().saturating_sub(1);
+    let mut out = String::with_capacity(len);
+    let mut parts = parts.iter();
+    if let Some(first) = parts.next() {
+        out.push_str(first);
+    }
+    for part in parts {
+        out.push_str(separator);
+        out.push_str(part);
+    }
+    out
+}
+
 fn compute_pytest_using_filename(classname: &str, name: &str, filename: &str) -> String {
     let path_components = filename.split('/').count();
 
@@ -13,17 +30,23 @@ fn compute_pytest_using_filename(classname: &str, name: &str, filename: &str) ->
         .join("::");
 
     if actual_classname.is_empty() {
-        format!("{}::{}", filename, name)
+        join_parts(&[filename, name], "::")
     } else {
-        format!("{}::{}::{}", filename, actual_classname, name)
+        join_parts(&[filename, &actual_classname, name], "::")
     }
 }
 
 fn path_from_classname(classname: &[&str]) -> String {
-    format!("{}.py", classname.join("/"))
+    let mut path = classname.join("/");
+    path.push_str(".py");
+    path
 }
 
-fn compute_pytest_using_network(classname: &str, name: &str, network: &HashSet<String>) -> String {
+/// Resolves the `filename::residual_classname` prefix of a pytest computed
+/// name by probing the network for ever shorter paths derived from the
+/// classname. This is the part of the name computation that only depends on
+/// the classname, which makes it cacheable across testcases.
+fn pytest_network_prefix(classname: &str, network: &HashSet<String>) -> String {
     let classname_components = classname.split(".").collect::<Vec<_>>();
     let mut path_component_count = 0;
     let start = classname_components.len();
@@ -37,22 +60,89 @@ fn compute_pytest_using_network(classname: &str, name: &str, network: &HashSet<S
                     .skip(start - path_component_count)
                     .collect::<Vec<_>>()
                     .join("::");
-                return format!("{}::{}::{}", path, actual_classname, name);
+                return join_parts(&[&path, &actual_classname], "::");
             } else {
-                return format!("{}::{}", path, name);
+                return path;
             }
         }
 
         path_component_count += 1;
     }
 
-    format!("{}::{}", classname, name)
+    classname.to_string()
+}
+
+fn compute_pytest_using_network(classname: &str, name: &str, network: &HashSet<String>) -> String {
+    let prefix = pytest_network_prefix(classname, network);
+    join_parts(&[&prefix, name], "::")
+}
+
+/// Checks for the `&` byte introducing an XML entity, eight bytes at a time.
+///
+/// XORing a chunk with `&` repeated turns every `&` into a zero byte, which
+/// the usual "has zero byte" bit trick then detects without a per-byte branch.
+fn contains_ampersand(bytes: &[u8]) -> bool {
+    const AMPERSANDS: u64 = u64::from_ne_bytes([b'&'; 8]);
+    const LOW_BITS: u64 = u64::from_ne_bytes([0x01; 8]);
+    const HIGH_BITS: u64 = u64::from_ne_bytes([0x80; 8]);
+
+    let mut chunks = bytes.chunks_exact(8);
+    for chunk in chunks.by_ref() {
+        let v = u64::from_ne_bytes(chunk.try_into().unwrap()) ^ AMPERSANDS;
+        if v.wrapping_sub(LOW_BITS) & !v & HIGH_BITS != 0 {
+            return true;
+        }
+    }
+    chunks.remainder().contains(&b'&')
 }
 
 pub fn unescape_str(s: &str) -> Cow<'_, str> {
+    // most names contain no entities at all, so skip the unescape machinery
+    // (and its allocation) unless an `&` is actually present
+    if !contains_ampersand(s.as_bytes()) {
+        return Cow::Borrowed(s);
+    }
     unescape(s).unwrap_or(Cow::Borrowed(s))
 }
 
+/// Single-entry cache for the pytest network path resolution of a classname.
+///
+/// Test runners emit the testcases of one class back to back, so caching
+/// just the most recently resolved classname already covers the common case
+/// without the footprint of a full map.
+#[derive(Default)]
+pub struct NameCache {
+    classname: String,
+    prefix: Option<String>,
+}
+
+/// Like [`compute_name`], but reuses the classname resolution of the
+/// previous call when the classname repeats, via the given cache.
+pub fn compute_name_cached(
+    cache: &mut NameCache,
+    classname: &str,
+    name: &str,
+    framework: Option<Framework>,
+    filename: Option<&str>,
+    network: Option<&HashSet<String>>,
+) -> String {
+    if framework == Some(Framework::Pytest) && filename.is_none() {
+        if let Some(network) = network {
+            if cache.prefix.is_none() || cache.classname != classname {
+                let unescaped = unescape_str(classname);
+                cache.classname.clear();
+                cache.classname.push_str(classname);
+                cache.prefix = Some(pytest_network_prefix(&unescaped, network));
+            }
+            let prefix = cache.prefix.as_deref().unwrap();
+            let name = unescape_str(name);
+            return join_parts(&[prefix, &name], "::");
+        }
+    }
+
+    compute_name(classname, name, framework, filename, network)
+}
+
 pub fn compute_name(
     classname: &str,
     name: &str,
@@ -64,9 +154,7 @@ pub fn compute_name(
     let classname = unescape_str(classname);
     match framework {
         Some(f) => compute_name_framework(&classname, &name, f, filename, network),
-        None => {
-            format!("{}::{}", classname, name)
-        }
+        None => join_parts(&[&classname, &name], "::"),
     }
 }
 
@@ -87,15 +175,11 @@ pub fn compute_name_framework(
             } else if let Some(network) = network {
                 compute_pytest_using_network(classname, name, network)
             } else {
-                format!("{}::{}", classname, name)
+                join_parts(&[classname, name], "::")
             }
         }
-        Framework::Vitest => {
-            format!("{} > {}", classname, name)
-        }
-        Framework::PHPUnit => {
-            format!("{}::{}", classname, name)
-        }
+        Framework::Vitest => join_parts(&[classname, name], " > "),
+        Framework::PHPUnit => join_parts(&[classname, name], "::"),
     }
 }
 
@@ -206,4 +290,51 @@ mod tests {
     fn test_compute_name_none() {
         assert_eq!(compute_name("a.b.c", "d", None, None, None), "a.b.c::d");
     }
+
+    #[test]
+    fn test_compute_name_cached_repeated_classname() {
+        let network = ["a/b.py"].iter().map(|e| e.to_string()).collect();
+        let mut cache = NameCache::default();
+
+        for name in ["d", "e"] {
+            assert_eq!(
+                compute_name_cached(
+                    &mut cache,
+                    "a.b.c",
+                    name,
+                    Some(Framework::Pytest),
+                    None,
+                    Some(&network)
+                ),
+                format!("a/b.py::c::{}", name)
+            );
+        }
+
+        // a different classname must invalidate the cached prefix
+        assert_eq!(
+            compute_name_cached(
+                &mut cache,
+                "a.b",
+                "d",
+                Some(Framework::Pytest),
+                None,
+                Some(&network)
+            ),
+            "a/b.py::d"
+        );
+    }
+
+    #[test]
+    fn test_unescape_str_borrows_without_entities() {
+        assert!(matches!(
+            unescape_str("a name without entities"),
+            Cow::Borrowed(_)
+        ));
+        // long enough to exercise the 8-byte chunked scan, `&` in the tail
+        assert_eq!(
+            unescape_str("a somewhat longer name &gt; with entities"),
+            "a somewhat longer name > with entities"
+        );
+        assert_eq!(unescape_str("&lt;short&gt;"), "<short>");
+    }
 }
@@ -8,7 +8,7 @@ use quick_xml::events::attributes::{Attribute, Attributes};
 use quick_xml::events::{BytesStart, Event};
 use quick_xml::reader::Reader;
 
-use crate::compute_name::{compute_name, unescape_str};
+use crate::compute_name::{compute_name_cached, unescape_str, NameCache};
 use crate::testrun::{check_testsuites_name, Framework, Outcome, PropertiesValue, Testrun};
 use crate::validated_string::ValidatedString;
 use crate::warning::WarningInfo;
@@ -102,12 +102,18 @@ fn get_attribute(e: &BytesStart, name: &str) -> Result<Option<String>> {
     Ok(attr)
 }
 
+/// Builds a [`Testrun`] from parsed testcase attributes.
+///
+/// `computed_name` is filled in right here, while the freshly parsed name,
+/// classname and filename are still hot, rather than in a second pass over
+/// the collected testruns.
 fn populate(
     rel_attrs: TestcaseAttrs,
     testsuite: ValidatedString,
     testsuite_time: Option<&str>,
     framework: Option<Framework>,
     network: Option<&HashSet<String>>,
+    name_cache: &mut NameCache,
 ) -> Result<(Testrun, Option<Framework>)> {
     let name = rel_attrs.name;
     let classname = rel_attrs.classname.unwrap_or_default();
@@ -132,7 +138,8 @@ fn populate(
     };
 
     let framework = framework.or_else(|| t.framework());
-    let computed_name = compute_name(
+    let computed_name = compute_name_cached(
+        name_cache,
         &t.classname,
         &t.name,
         framework,
@@ -146,16 +153,11 @@ fn populate(
 }
 
 pub fn get_position_info(input: &[u8], byte_offset: usize) -> (usize, usize) {
-    let mut line = 1;
-    let mut last_newline = 0;
-
-    for (i, &byte) in input.iter().take(byte_offset).enumerate() {
-        if byte == b'\n' {
-            line += 1;
-            last_newline = i + 1;
-        }
-    }
-
+    // let memchr do the newline scanning in wide loads rather than walking
+    // the input a byte at a time
+    let scanned = &input[..byte_offset.min(input.len())];
+    let line = memchr::memchr_iter(b'\n', scanned).count() + 1;
+    let last_newline = memchr::memrchr(b'\n', scanned).map_or(0, |i| i + 1);
     let column = byte_offset - last_newline + 1;
 
     (line, column)
@@ -290,7 +292,10 @@ pub fn use_reader(
     reader: &mut Reader<&[u8]>,
     network: Option<&HashSet<String>>,
 ) -> PyResult<(Option<Framework>, Vec<Testrun>, Vec<WarningInfo>)> {
-    let mut testruns: Vec<Testrun> = Vec::new();
+    // sizing the output up front costs one SIMD substring scan over the
+    // input and spares the doubling reallocations while pushing testruns
+    let testcase_count = memchr::memmem::find_iter(reader.get_ref(), b"<testcase").count();
+    let mut testruns: Vec<Testrun> = Vec::with_capacity(testcase_count);
     let mut saved_testrun: Option<TestrunOrSkipped> = None;
 
     let mut in_failure: bool = false;
@@ -300,12 +305,15 @@ pub fn use_reader(
 
     let mut warnings: Vec<WarningInfo> = Vec::new();
 
-    // every time we come across a testsuite element we update this vector:
-    // if the testsuite element contains the time attribute append its value to this vec
-    // else append a clone of the last value in the vec
+    // every time we come across a testsuite element we push onto these stacks;
+    // each entry stores the innermost name/time in effect at that depth
+    // (inherited from the enclosing testsuite when the element has none), so
+    // testcases only ever look at the top of the stack
     let mut testsuite_names: Vec<Option<ValidatedString>> = vec![];
     let mut testsuite_times: Vec<Option<String>> = vec![];
 
+    let mut name_cache = NameCache::default();
+
     let mut buf = Vec::new();
     loop {
         let event = reader
@@ -323,13 +331,14 @@ pub fn use_reader(
                             let (testrun, parsed_framework) = populate(
                                 attrs,
                                 testsuite_names
-                                    .iter()
-                                    .rev()
-                                    .find_map(|e| e.clone())
+                                    .last()
+                                    .cloned()
+                                    .flatten()
                                     .unwrap_or_default(),
-                                testsuite_times.iter().rev().find_map(|e| e.as_deref()),
+                                testsuite_times.last().and_then(|e| e.as_deref()),
                                 framework,
                                 network,
+                                &mut name_cache,
                             )?;
                             saved_testrun = Some(TestrunOrSkipped::Testrun(testrun));
                             framework = parsed_framework;
@@ -395,15 +404,18 @@ pub fn use_reader(
                     in_failure = true;
                 }
                 b"testsuite" => {
-                    testsuite_names.push(
-                        get_attribute(&e, "name")?
-                            .map(|s| {
-                                ValidatedString::from_string(s)
-                                    .context("Error converting testsuite name to ValidatedString")
-                            })
-                            .transpose()?,
-                    );
-                    testsuite_times.push(get_attribute(&e, "time")?);
+                    let name = get_attribute(&e, "name")?
+                        .map(|s| {
+                            ValidatedString::from_string(s)
+                                .context("Error converting testsuite name to ValidatedString")
+                        })
+                        .transpose()?;
+                    let inherited_name = testsuite_names.last().cloned().flatten();
+                    testsuite_names.push(name.or(inherited_name));
+
+                    let time = get_attribute(&e, "time")?;
+                    let inherited_time = testsuite_times.last().cloned().flatten();
+                    testsuite_times.push(time.or(inherited_time));
                 }
                 b"testsuites" => {
                     let testsuites_name = get_attribute(&e, "name")?;
@@ -443,13 +455,14 @@ pub fn use_reader(
                             let (testrun, parsed_framework) = populate(
                                 attrs,
                                 testsuite_names
-                                    .iter()
-                                    .rev()
-                                    .find_map(|e| e.clone())
+                                    .last()
+                                    .cloned()
+                                    .flatten()
                                     .unwrap_or_default(),
-                                testsuite_times.iter().rev().find_map(|e| e.as_deref()),
+                                testsuite_times.last().and_then(|e| e.as_deref()),
                                 framework,
                                 network,
+                                &mut name_cache,
                             )?;
                             testruns.push(testrun);
                             framework = parsed_framework;
@@ -18,6 +18,10 @@ pyo3::create_exception!(test_results_parser, ComputeNameError, PyException);
 #[pymodule]
 fn test_results_parser(_: Python, m: &Bound<PyModule>) -> PyResult<()> {
     m.add_function(wrap_pyfunction!(raw_upload::parse_raw_upload, m)?)?;
+    m.add_function(wrap_pyfunction!(
+        raw_upload::parse_raw_upload_from_parts,
+        m
+    )?)?;
     m.add_function(wrap_pyfunction!(failure_message::build_message, m)?)?;
     m.add_function(wrap_pyfunction!(failure_message::escape_message, m)?)?;
     m.add_function(wrap_pyfunction!(failure_message::shorten_file_paths, m)?)?;
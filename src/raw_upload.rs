@@ -2,28 +2,42 @@ use anyhow::Context;
 
 use base64::prelude::*;
 use pyo3::prelude::*;
+use pyo3::types::PyBytes;
+use std::borrow::Cow;
+use std::cell::RefCell;
 use std::collections::HashSet;
 use std::io::prelude::*;
 
-use flate2::bufread::ZlibDecoder;
+use flate2::{Decompress, FlushDecompress, Status};
 
 use quick_xml::reader::Reader;
+use rayon::prelude::*;
 use serde::Deserialize;
 
 use crate::junit::{get_position_info, use_reader};
 use crate::testrun::ParsingInfo;
 use crate::warning::WarningInfo;
 
+// the string fields borrow from the upload bytes where the JSON contains
+// no escapes, which is always the case for the base64 `data` payload
 #[derive(Deserialize, Debug, Clone)]
-struct TestResultFile {
-    filename: String,
-    data: String,
+struct TestResultFile<'a> {
+    #[serde(borrow)]
+    filename: Cow<'a, str>,
+    /// The encoding of `data`; only `base64+compressed` (base64-wrapped
+    /// zlib) exists today, and missing means the same for backwards
+    /// compatibility.
+    #[serde(default, borrow)]
+    format: Option<Cow<'a, str>>,
+    #[serde(borrow)]
+    data: Cow<'a, str>,
 }
 #[derive(Deserialize, Debug, Clone)]
-struct RawTestResultUpload {
+struct RawTestResultUpload<'a> {
     #[serde(default)]
     network: Option<HashSet<String>>,
-    test_results_files: Vec<TestResultFile>,
+    #[serde(borrow)]
+    test_results_files: Vec<TestResultFile<'a>>,
 }
 
 #[derive(Debug, Clone)]
@@ -35,18 +49,33 @@ struct ReadableFile {
 const LEGACY_FORMAT_PREFIX: &[u8] = b"# path=";
 const LEGACY_FORMAT_SUFFIX: &[u8] = b"<<<<<< EOF";
 
-fn serialize_to_legacy_format(readable_files: Vec<ReadableFile>) -> Vec<u8> {
-    let mut res = Vec::new();
+/// The exact size of the legacy-format rendering of `readable_files`.
+fn legacy_format_len(readable_files: &[ReadableFile]) -> usize {
+    readable_files
+        .iter()
+        .map(|file| {
+            LEGACY_FORMAT_PREFIX.len()
+                + file.filename.len()
+                + file.data.len()
+                + LEGACY_FORMAT_SUFFIX.len()
+                + 3 // the newlines after path, data and suffix
+        })
+        .sum()
+}
+
+/// Writes the legacy format into `out`, which must be exactly
+/// [`legacy_format_len`] bytes long.
+fn write_legacy_format(mut out: &mut [u8], readable_files: &[ReadableFile]) -> std::io::Result<()> {
     for file in readable_files {
-        res.extend_from_slice(LEGACY_FORMAT_PREFIX);
-        res.extend_from_slice(file.filename.as_bytes());
-        res.extend_from_slice(b"\n");
-        res.extend_from_slice(&file.data);
-        res.extend_from_slice(b"\n");
-        res.extend_from_slice(LEGACY_FORMAT_SUFFIX);
-        res.extend_from_slice(b"\n");
+        out.write_all(LEGACY_FORMAT_PREFIX)?;
+        out.write_all(file.filename.as_bytes())?;
+        out.write_all(b"\n")?;
+        out.write_all(&file.data)?;
+        out.write_all(b"\n")?;
+        out.write_all(LEGACY_FORMAT_SUFFIX)?;
+        out.write_all(b"\n")?;
     }
-    res
+    Ok(())
 }
 
 // the warnings should be ordered by location because they're pushed to the vec as we parse
@@ -54,21 +83,22 @@ fn serialize_to_legacy_format(readable_files: Vec<ReadableFile>) -> Vec<u8> {
 // implicitly tested by warnings-junit.xml
 fn format_warnings(input: &[u8], warnings: Vec<WarningInfo>, filename: &str) -> Vec<String> {
     let mut offset = 0;
-    let mut result = Vec::new();
-    let mut line = 1;
-    let mut col = 0;
-    let mut input_iter = input.iter();
+    let mut result = Vec::with_capacity(warnings.len());
+    let mut line: usize = 1;
+    let mut col: usize = 0;
+    let mut cursor = 0;
     for warning in warnings {
-        for bytes in input_iter
-            .by_ref()
-            .take((warning.location - offset) as usize)
-        {
-            if *bytes == b'\n' {
-                line += 1;
-                col = 0;
-            } else {
-                col += 1;
+        let take = (warning.location - offset) as usize;
+        let segment = &input[cursor..input.len().min(cursor + take)];
+        cursor += segment.len();
+        // advance line/col over the segment with memchr's vectorized scan
+        // instead of inspecting every byte
+        match memchr::memrchr(b'\n', segment) {
+            Some(last_newline) => {
+                line += memchr::memchr_iter(b'\n', segment).count();
+                col = segment.len() - 1 - last_newline;
             }
+            None => col += segment.len(),
         }
         offset += warning.location;
         result.push(format!(
@@ -79,67 +109,217 @@ fn format_warnings(input: &[u8], warnings: Vec<WarningInfo>, filename: &str) ->
     result
 }
 
-#[pyfunction]
-#[pyo3(signature = (raw_upload_bytes))]
-pub fn parse_raw_upload(raw_upload_bytes: &[u8]) -> anyhow::Result<(Vec<ParsingInfo>, Vec<u8>)> {
-    let upload: RawTestResultUpload =
-        serde_json::from_slice(raw_upload_bytes).context("Error deserializing json")?;
-    let network: Option<HashSet<String>> = upload.network;
-
-    let mut results: Vec<ParsingInfo> = Vec::with_capacity(upload.test_results_files.len());
-    let mut readable_files: Vec<ReadableFile> = Vec::with_capacity(upload.test_results_files.len());
-
-    for file in upload.test_results_files {
-        let decoded_file_bytes = BASE64_STANDARD
-            .decode(file.data)
-            .context("Error decoding base64")?;
-
-        let mut decoder = ZlibDecoder::new(decoded_file_bytes.as_slice());
-
-        let mut decompressed_file_bytes = Vec::new();
-        decoder
-            .read_to_end(&mut decompressed_file_bytes)
-            .context("Error decompressing file")?;
-
-        let mut reader = Reader::from_reader(decompressed_file_bytes.as_slice());
-        reader.config_mut().trim_text(true);
-        let (framework, testruns, warnings) = use_reader(&mut reader, network.as_ref())
-            .with_context(|| {
-                let pos_conversion = reader.buffer_position().try_into();
-                match pos_conversion {
-                    Ok(pos) => {
-                        let (line, col) = get_position_info(&decompressed_file_bytes, pos);
-                        format!(
-                            "Error parsing JUnit XML in {} at {}:{}",
-                            file.filename, line, col
-                        )
+/// Per-thread scratch state for decoding uploaded files.
+///
+/// The decompressed bytes themselves escape the call (they end up in the
+/// returned legacy blob), so only the pieces that stay internal are pooled
+/// here: zlib's inflate context and the staging chunk the base64 decoder
+/// fills before inflation.
+struct ParserState {
+    // 64 KB chunks keep the per-call overhead of the decoder and the
+    // inflater negligible relative to the work done per chunk
+    decode_buf: Vec<u8>,
+    decompress: Decompress,
+}
+
+impl ParserState {
+    fn new() -> Self {
+        Self {
+            decode_buf: vec![0; 64 * 1024],
+            decompress: Decompress::new(true),
+        }
+    }
+}
+
+thread_local! {
+    // one state per (rayon worker) thread: resetting the inflate context is
+    // much cheaper than allocating zlib's window state anew for every file
+    static PARSER_STATE: RefCell<ParserState> = RefCell::new(ParserState::new());
+}
+
+/// Inflates a zlib stream into a freshly allocated buffer, reusing the
+/// thread's scratch state.
+///
+/// zlib does not record the decompressed size, so the output is sized from
+/// `compressed_size` at the ~4x ratio deflate typically reaches on JUnit
+/// XML; for the usual file this avoids regrowing the buffer entirely.
+fn inflate(mut compressed: impl Read, compressed_size: usize) -> anyhow::Result<Vec<u8>> {
+    PARSER_STATE.with(|state| {
+        let ParserState {
+            decode_buf,
+            decompress,
+        } = &mut *state.borrow_mut();
+        decompress.reset(true);
+
+        let mut decompressed = Vec::with_capacity((compressed_size * 4).max(32 * 1024));
+        let (mut start, mut end) = (0, 0);
+        let mut eof = false;
+        loop {
+            if start == end && !eof {
+                end = compressed.read(decode_buf).context("Error decoding file")?;
+                start = 0;
+                eof = end == 0;
+            }
+            if decompressed.len() == decompressed.capacity() {
+                decompressed.reserve(32 * 1024);
+            }
+            let flush = if eof {
+                FlushDecompress::Finish
+            } else {
+                FlushDecompress::None
+            };
+
+            let before_in = decompress.total_in();
+            let before_out = decompress.total_out();
+            let status = decompress
+                .decompress_vec(&decode_buf[start..end], &mut decompressed, flush)
+                .context("Error decompressing file")?;
+            let consumed = (decompress.total_in() - before_in) as usize;
+            let produced = decompress.total_out() - before_out;
+            start += consumed;
+
+            match status {
+                Status::StreamEnd => return Ok(decompressed),
+                Status::Ok | Status::BufError => {
+                    // spare output capacity is guaranteed above, so making
+                    // no progress at the end of input means the stream is
+                    // cut short
+                    if eof && consumed == 0 && produced == 0 {
+                        anyhow::bail!("Error decompressing file: truncated zlib stream");
                     }
-                    Err(_) => format!("Error parsing JUnit XML in {}", file.filename),
                 }
-            })?;
-
-        let warning_strings: Vec<String> =
-            format_warnings(&decompressed_file_bytes, warnings, &file.filename);
-
-        let parsing_info = ParsingInfo {
-            framework,
-            testruns,
-            warnings: warning_strings,
-        };
-        results.push(parsing_info);
-
-        let readable_file = ReadableFile {
-            data: decompressed_file_bytes,
-            filename: file.filename,
-        };
-        readable_files.push(readable_file);
+            }
+        }
+    })
+}
+
+/// Decodes, decompresses and parses a single uploaded JUnit file.
+fn process_file(
+    file: TestResultFile<'_>,
+    network: Option<&HashSet<String>>,
+) -> anyhow::Result<(ParsingInfo, ReadableFile)> {
+    match file.format.as_deref() {
+        None | Some("base64+compressed") => {}
+        Some(other) => anyhow::bail!("Unsupported test results file format: {}", other),
     }
 
-    let readable_file = serialize_to_legacy_format(readable_files);
+    // decode base64 lazily as the inflater consumes it, so the compressed
+    // bytes never have to be materialized in a buffer of their own
+    let compressed_size = file.data.len() / 4 * 3;
+    let base64_reader = base64::read::DecoderReader::new(file.data.as_bytes(), &BASE64_STANDARD);
+    let decompressed_file_bytes = inflate(base64_reader, compressed_size)?;
+
+    parse_readable_file(file.filename.into_owned(), decompressed_file_bytes, network)
+}
+
+/// Parses an already-decoded JUnit XML file.
+fn parse_readable_file(
+    filename: String,
+    decompressed_file_bytes: Vec<u8>,
+    network: Option<&HashSet<String>>,
+) -> anyhow::Result<(ParsingInfo, ReadableFile)> {
+    let mut reader = Reader::from_reader(decompressed_file_bytes.as_slice());
+    let config = reader.config_mut();
+    config.trim_text(true);
+    // JUnit files come straight out of test runners, so don't pay for
+    // matching every closing tag against the stack of open ones;
+    // mismatches we care about are caught by our own testcase handling
+    config.check_end_names = false;
+    let (framework, testruns, warnings) = use_reader(&mut reader, network).with_context(|| {
+        let pos_conversion = reader.buffer_position().try_into();
+        match pos_conversion {
+            Ok(pos) => {
+                let (line, col) = get_position_info(&decompressed_file_bytes, pos);
+                format!(
+                    "Error parsing JUnit XML in {} at {}:{}",
+                    filename, line, col
+                )
+            }
+            Err(_) => format!("Error parsing JUnit XML in {}", filename),
+        }
+    })?;
+
+    let warning_strings: Vec<String> =
+        format_warnings(&decompressed_file_bytes, warnings, &filename);
+
+    let parsing_info = ParsingInfo {
+        framework,
+        testruns,
+        warnings: warning_strings,
+    };
+
+    let readable_file = ReadableFile {
+        data: decompressed_file_bytes,
+        filename,
+    };
+
+    Ok((parsing_info, readable_file))
+}
+
+#[pyfunction]
+#[pyo3(signature = (raw_upload_bytes))]
+pub fn parse_raw_upload<'py>(
+    py: Python<'py>,
+    raw_upload_bytes: &[u8],
+) -> anyhow::Result<(Vec<ParsingInfo>, Bound<'py, PyBytes>)> {
+    // everything below is pure Rust until the results are converted on
+    // return, so let other Python threads run in the meantime
+    let (results, readable_files) = py.allow_threads(|| {
+        let upload: RawTestResultUpload =
+            serde_json::from_slice(raw_upload_bytes).context("Error deserializing json")?;
+        let network: Option<HashSet<String>> = upload.network;
+
+        // files are independent of each other, so decode and parse them in
+        // parallel; `collect` keeps the results in upload order
+        let processed: Vec<(ParsingInfo, ReadableFile)> = upload
+            .test_results_files
+            .into_par_iter()
+            .map(|file| process_file(file, network.as_ref()))
+            .collect::<anyhow::Result<_>>()?;
+
+        let (results, readable_files): (Vec<_>, Vec<ReadableFile>) = processed.into_iter().unzip();
+        Ok::<_, anyhow::Error>((results, readable_files))
+    })?;
+
+    // write the legacy format straight into the Python bytes object, instead
+    // of assembling it in a Vec and copying it across the boundary
+    let readable_file = PyBytes::new_with(py, legacy_format_len(&readable_files), |buffer| {
+        write_legacy_format(buffer, &readable_files)?;
+        Ok(())
+    })?;
 
     Ok((results, readable_file))
 }
 
+/// Parses a single JUnit XML file that is already decoded.
+///
+/// This skips the upload envelope entirely — no JSON, base64 or zlib — for
+/// callers that hold the raw XML bytes, and returns the parsing info of the
+/// one file together with its legacy-format rendering.
+#[pyfunction]
+#[pyo3(signature = (filename, raw_xml, network=None))]
+pub fn parse_raw_upload_from_parts<'py>(
+    py: Python<'py>,
+    filename: &str,
+    raw_xml: &[u8],
+    network: Option<Vec<String>>,
+) -> anyhow::Result<(ParsingInfo, Bound<'py, PyBytes>)> {
+    // accept any Python list (matching the `network` key of the JSON
+    // envelope) and build the lookup set on this side
+    let network: Option<HashSet<String>> = network.map(|network| network.into_iter().collect());
+    let (parsing_info, readable) = py.allow_threads(|| {
+        parse_readable_file(filename.to_string(), raw_xml.to_vec(), network.as_ref())
+    })?;
+
+    let files = [readable];
+    let readable_file = PyBytes::new_with(py, legacy_format_len(&files), |buffer| {
+        write_legacy_format(buffer, &files)?;
+        Ok(())
+    })?;
+
+    Ok((parsing_info, readable_file))
+}
+
 #[cfg(test)]
 mod tests {
     use base64::engine::general_purpose::STANDARD as BASE64_STANDARD;
@@ -166,15 +346,15 @@ mod tests {
 
     #[test]
     fn test_parse_raw_upload_success() {
+        pyo3::prepare_freethreaded_python();
         glob!("../tests", "*.xml", |path| {
             let upload_json = file_into_bytes(path.to_str().unwrap());
-            let result = parse_raw_upload(&upload_json);
-            match result {
+            Python::with_gil(|py| match parse_raw_upload(py, &upload_json) {
                 Ok((results, _)) => assert_yaml_snapshot!(results),
                 Err(e) => {
                     assert_yaml_snapshot!(e.to_string());
                 }
-            }
+            });
         });
     }
 }
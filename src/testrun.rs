@@ -1,5 +1,9 @@
+use std::sync::OnceLock;
+
+use aho_corasick::AhoCorasick;
+use pyo3::intern;
 use pyo3::prelude::*;
-use pyo3::types::PyString;
+use pyo3::types::{PyDict, PyString};
 use pyo3::{PyAny, PyResult};
 use serde::Serialize;
 use serde_json::Value;
@@ -16,22 +20,64 @@ static FRAMEWORKS: [(&str, Framework); 4] = [
 static EXTENSIONS: [(&str, Framework); 2] =
     [(".py", Framework::Pytest), (".php", Framework::PHPUnit)];
 
-fn check_substring_before_word_boundary(string: &str, substring: &str) -> bool {
-    if let Some((_, suffix)) = string.to_lowercase().split_once(substring) {
-        return suffix
+fn framework_detector() -> &'static AhoCorasick {
+    static DETECTOR: OnceLock<AhoCorasick> = OnceLock::new();
+    DETECTOR.get_or_init(|| {
+        AhoCorasick::builder()
+            .ascii_case_insensitive(true)
+            .build(FRAMEWORKS.iter().map(|(name, _)| *name))
+            .unwrap()
+    })
+}
+
+fn extension_detector() -> &'static AhoCorasick {
+    static DETECTOR: OnceLock<AhoCorasick> = OnceLock::new();
+    DETECTOR.get_or_init(|| {
+        AhoCorasick::builder()
+            .ascii_case_insensitive(true)
+            .build(EXTENSIONS.iter().map(|(extension, _)| *extension))
+            .unwrap()
+    })
+}
+
+/// For each pattern of the detector, checks whether its first occurrence in
+/// `haystack` ends at a word boundary (the next character is missing or not
+/// alphanumeric).
+fn matches_before_word_boundary<const N: usize>(
+    detector: &AhoCorasick,
+    haystack: &str,
+) -> [bool; N] {
+    let mut seen = [false; N];
+    let mut valid = [false; N];
+    let mut remaining = N;
+
+    for m in detector.find_iter(haystack) {
+        let idx = m.pattern().as_usize();
+        if seen[idx] {
+            continue;
+        }
+        seen[idx] = true;
+        // the patterns are pure ASCII, so `m.end()` is a char boundary
+        valid[idx] = haystack[m.end()..]
             .chars()
             .next()
             .is_none_or(|first_char| !first_char.is_alphanumeric());
+
+        remaining -= 1;
+        if remaining == 0 {
+            break;
+        }
     }
-    false
+
+    valid
 }
 
 pub fn check_testsuites_name(testsuites_name: &str) -> Option<Framework> {
+    let valid = matches_before_word_boundary::<4>(framework_detector(), testsuites_name);
     FRAMEWORKS
         .iter()
-        .filter_map(|(name, framework)| {
-            check_substring_before_word_boundary(testsuites_name, name).then_some(*framework)
-        })
+        .enumerate()
+        .filter_map(|(idx, (_, framework))| valid[idx].then_some(*framework))
         .next()
 }
 
@@ -150,8 +196,10 @@ impl<'py> FromPyObject<'py> for PropertiesValue {
     }
 }
 
-// i can't seem to get  pyo3(from_item_all) to work when IntoPyObject is also being derived
-#[derive(IntoPyObject, FromPyObject, Clone, Debug, Serialize, PartialEq)]
+// note that this is a plain Rust struct, not a #[pyclass]: parsing works on
+// `Vec<Testrun>` entirely on the Rust side and each run crosses the FFI
+// boundary exactly once, as a dict, when the result is returned
+#[derive(FromPyObject, Clone, Debug, Serialize, PartialEq)]
 pub struct Testrun {
     #[pyo3(item)]
     pub name: ValidatedString,
@@ -175,34 +223,55 @@ pub struct Testrun {
     pub properties: PropertiesValue,
 }
 
+// a hand-written conversion instead of the derive so the dict keys can be
+// interned: one PyString per key for the life of the process, rather than a
+// fresh allocation per field of every testcase
+impl<'py> IntoPyObject<'py> for Testrun {
+    type Target = PyDict;
+    type Output = Bound<'py, Self::Target>;
+    type Error = PyErr;
+
+    fn into_pyobject(self, py: Python<'py>) -> Result<Self::Output, Self::Error> {
+        let dict = PyDict::new(py);
+        dict.set_item(intern!(py, "name"), self.name)?;
+        dict.set_item(intern!(py, "classname"), self.classname)?;
+        dict.set_item(intern!(py, "duration"), self.duration)?;
+        dict.set_item(intern!(py, "outcome"), self.outcome)?;
+        dict.set_item(intern!(py, "testsuite"), self.testsuite)?;
+        dict.set_item(intern!(py, "failure_message"), self.failure_message)?;
+        dict.set_item(intern!(py, "filename"), self.filename)?;
+        dict.set_item(intern!(py, "build_url"), self.build_url)?;
+        dict.set_item(intern!(py, "computed_name"), self.computed_name)?;
+        dict.set_item(intern!(py, "properties"), self.properties)?;
+        Ok(dict)
+    }
+}
+
 impl Testrun {
     pub fn framework(&self) -> Option<Framework> {
-        for (name, framework) in FRAMEWORKS {
-            if check_substring_before_word_boundary(&self.testsuite, name) {
-                return Some(framework);
-            }
+        if let Some(framework) = check_testsuites_name(&self.testsuite) {
+            return Some(framework);
         }
 
-        for (extension, framework) in EXTENSIONS {
-            if check_substring_before_word_boundary(&self.classname, extension)
-                || check_substring_before_word_boundary(&self.name, extension)
-            {
-                return Some(framework);
-            }
-
-            if let Some(message) = &self.failure_message {
-                if check_substring_before_word_boundary(message, extension) {
-                    return Some(framework);
-                }
-            }
-
-            if let Some(filename) = &self.filename {
-                if check_substring_before_word_boundary(filename, extension) {
-                    return Some(framework);
-                }
+        let mut valid = [false; 2];
+        let fields = [
+            Some(&*self.classname),
+            Some(&*self.name),
+            self.failure_message.as_deref(),
+            self.filename.as_deref(),
+        ];
+        for field in fields.into_iter().flatten() {
+            let field_valid = matches_before_word_boundary::<2>(extension_detector(), field);
+            for (valid, field_valid) in valid.iter_mut().zip(field_valid) {
+                *valid |= field_valid;
             }
         }
-        None
+
+        EXTENSIONS
+            .iter()
+            .enumerate()
+            .filter_map(|(idx, (_, framework))| valid[idx].then_some(*framework))
+            .next()
     }
 }
 
@@ -17,3 +17,6 @@ class ParsingInfo(TypedDict):
     warnings: list[str]
 
 def parse_raw_upload(raw_upload_bytes: bytes) -> tuple[list[ParsingInfo], bytes]: ...
+def parse_raw_upload_from_parts(
+    filename: str, raw_xml: bytes, network: list[str] | None = None
+) -> tuple[ParsingInfo, bytes]: ...
@@ -1,7 +1,5 @@
 from datetime import datetime, timezone
 import json
-import base64
-import zlib
 
 from test_results_parser import (
     parse_raw_upload,
@@ -9,18 +7,15 @@ from test_results_parser import (
     BinaryFormatWriter,
 )
 
-def test_aggregation():
-    with open("./tests/junit.xml", "br") as f:
-        junit_file = f.read()
-
-        raw_upload = {
-            "test_results_files": [
-                {
-                    "filename": "test_results.json",
-                    "data": base64.b64encode(zlib.compress(junit_file)).decode("utf-8"),
-                }
-            ]
-        }
+def test_aggregation(junit_upload_data):
+    raw_upload = {
+        "test_results_files": [
+            {
+                "filename": "test_results.json",
+                "data": junit_upload_data,
+            }
+        ]
+    }
 
     parsed, _ = parse_raw_upload(json.dumps(raw_upload).encode("utf-8"))
 
@@ -55,4 +50,53 @@ def test_aggregation():
             "commits_where_fail":test.commits_where_fail,
             "last_duration":test.last_duration,# TODO
         }
-        print(test_dict)
\ No newline at end of file
+        print(test_dict)
+
+    dumped = json.loads(reader.dump_json(0, 2))
+    assert len(dumped) == len(tests)
+    for row, test in zip(dumped, tests):
+        assert row["name"] == test.name
+        assert row["total_pass_count"] == test.total_pass_count
+
+
+def test_aggregation_columnar(junit_upload_data):
+    raw_upload = {
+        "test_results_files": [
+            {
+                "filename": "test_results.json",
+                "data": junit_upload_data,
+            }
+        ]
+    }
+
+    parsed, _ = parse_raw_upload(json.dumps(raw_upload).encode("utf-8"))
+
+    now = int(datetime.now(timezone.utc).timestamp())
+
+    writer = BinaryFormatWriter()
+    writer.add_testruns(
+        timestamp=now,
+        commit_hash="e9fcd08652d091fa0c8d28e323c24fb0f4acf249",
+        flags=["upload", "flags"],
+        testruns=parsed[0]["testruns"],
+    )
+
+    serialized = writer.serialize()
+    reader = AggregationReader(serialized, now)
+
+    tests = reader.get_test_aggregates(0, 2)
+    columns = reader.get_test_aggregates_columnar(0, 2)
+
+    assert len(columns["name"]) == len(tests)
+    for i, test in enumerate(tests):
+        assert columns["name"][i] == test.name
+        assert columns["testsuite"][i] == test.testsuite
+        assert columns["flags"][i] == test.flags
+        assert columns["failure_rate"][i] == test.failure_rate
+        assert columns["flake_rate"][i] == test.flake_rate
+        assert columns["avg_duration"][i] == test.avg_duration
+        assert columns["total_fail_count"][i] == test.total_fail_count
+        assert columns["total_flaky_fail_count"][i] == test.total_flaky_fail_count
+        assert columns["total_pass_count"][i] == test.total_pass_count
+        assert columns["total_skip_count"][i] == test.total_skip_count
+        assert columns["commits_where_fail"][i] == test.commits_where_fail
\ No newline at end of file
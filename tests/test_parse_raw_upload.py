@@ -2,36 +2,56 @@ import pytest
 import base64
 import zlib
 import json
-from test_results_parser import parse_raw_upload
+from test_results_parser import parse_raw_upload, parse_raw_upload_from_parts
 class TestParsers:
-    def test_junit(self, snapshot):
-        with open("tests/junit.xml", "b+r") as f:
-            file_bytes = f.read()
-            raw_upload = {
-                "network": [
-                    "a/b/c.py",
-                ],
-                "test_results_files": [
-                    {
-                        "filename": "junit.xml",
-                        "format": "base64+compressed",
-                        "data": base64.b64encode(zlib.compress(file_bytes)).decode(
-                            "utf-8"
-                        ),
-                    }
-                ]
-            }
-            json_bytes = json.dumps(raw_upload).encode("utf-8")
-            parsing_infos, readable_files_bytes = parse_raw_upload(json_bytes)
+    def test_junit(self, snapshot, junit_upload_data):
+        raw_upload = {
+            "network": [
+                "a/b/c.py",
+            ],
+            "test_results_files": [
+                {
+                    "filename": "junit.xml",
+                    "format": "base64+compressed",
+                    "data": junit_upload_data,
+                }
+            ]
+        }
+        json_bytes = json.dumps(raw_upload).encode("utf-8")
+        parsing_infos, readable_files_bytes = parse_raw_upload(json_bytes)
 
 
-            readable_files = bytes(readable_files_bytes)
+        readable_files = bytes(readable_files_bytes)
 
 
-            assert snapshot("bin") == readable_files
-            assert snapshot("json") == parsing_infos
+        assert snapshot("bin") == readable_files
+        assert snapshot("json") == parsing_infos
+
+
+
+    def test_junit_from_parts(self, junit_file, junit_upload_data):
+        # skipping the envelope must give the same result as the full path
+        raw_upload = {
+            "network": [
+                "a/b/c.py",
+            ],
+            "test_results_files": [
+                {
+                    "filename": "junit.xml",
+                    "format": "base64+compressed",
+                    "data": junit_upload_data,
+                }
+            ]
+        }
+        json_bytes = json.dumps(raw_upload).encode("utf-8")
+        parsing_infos, readable_files_bytes = parse_raw_upload(json_bytes)
 
+        parsing_info, readable_file_bytes = parse_raw_upload_from_parts(
+            "junit.xml", junit_file, ["a/b/c.py"]
+        )
 
+        assert parsing_info == parsing_infos[0]
+        assert readable_file_bytes == readable_files_bytes
 
     def test_json_error(self):
         with pytest.raises(RuntimeError):